@@ -20,6 +20,13 @@ CLIENT_ID = ""
 # The absolute path to the directory in which main.py resides.
 CODE_PATH = ""
 
+# SHARDING ########################################################################################
+
+# The absolute path to a directory, shared by all scanning hosts, in which shard scans are stored.
+SHARD_DIR = ""
+# The number of shards into which the top level entries of SRC_DIR are partitioned.
+NUM_SHARDS = 1
+
 # MISSION CRITICAL [DO NOT EDIT] ##################################################################
 
 # The format for dates.
@@ -34,5 +41,7 @@ SHELF_PATH = os.path.join(CODE_PATH, SHELF_NAME)
 SHELF_TIMESTAMP_KEY = "GLOBAL_TIMESTAMP"
 # The key to the trie in the shelf.
 SHELF_TRIE_KEY = "TRIE"
+# The absolute path to the lock held by the shard coordinator while merging.
+SHARD_LOCK_PATH = os.path.join(SHARD_DIR, "coordinator.lock")
 # The absolute path to the refresh token in the source endpoint.
 TOKEN_PATH = os.path.join(CODE_PATH, "refresh_token")
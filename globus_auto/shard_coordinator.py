@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import config
+import os
+import shelve
+import utils
+
+"""This code merges the shards scanned by shard_worker.py into the shelf and performs a single 
+Globus transfer of the additions and changes they contain. Every shard must have been scanned 
+since the last merge."""
+
+__author__ = "Matthew E. Li"
+__email__ = "meli@lbl.gov"
+
+def main():
+    """Merge the scanned shards and transfer to the appropriate endpoint if ready."""
+    logger = utils.get_logger(__name__, config.LOG_PATH)
+    logger.info("".join(["=" for i in range(100)]))
+    if not utils.dir_exists(config.SHARD_DIR):
+        logger.error("The shard directory {} does not exist.".format(config.SHARD_DIR))
+        return
+    try:
+        lock = os.open(config.SHARD_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        owner = ""
+        try:
+            with open(config.SHARD_LOCK_PATH, "r") as lock_file:
+                owner = lock_file.read().strip()
+        except FileNotFoundError:
+            pass
+        owner = owner or "an unknown process"
+        logger.error(("The lock {} is held by {}, so another merge is in progress. If that "
+                      "process is no longer running, remove the lock.").format(
+                          config.SHARD_LOCK_PATH, owner))
+        return
+    try:
+        owner = "process {} on {}".format(os.getpid(), os.uname().nodename)
+        os.write(lock, owner.encode("utf-8"))
+        merge_shards(logger)
+    finally:
+        os.close(lock)
+        os.remove(config.SHARD_LOCK_PATH)
+
+def merge_shards(logger):
+    """Claims the scanned shards, merges them into the trie, transfers any additions or changes 
+    and removes the claimed shards once the shelf has been saved. Claimed shards are kept for the 
+    next run if the endpoints are not ready.
+
+    Keyword Arguments:
+    logger -- the logger to write to
+    """
+    logger.info("Checking if all shards were scanned...")
+    claimed_paths, missing = [], []
+    for shard in range(config.NUM_SHARDS):
+        claimed_path = utils.claim_shard_fragment(config.SHARD_DIR, shard)
+        if claimed_path:
+            claimed_paths.append(claimed_path)
+        else:
+            missing.append(utils.shard_fragment_path(config.SHARD_DIR, shard))
+    if missing:
+        logger.error("Shards were not scanned: {}.".format(", ".join(missing)))
+        return
+    shelf = shelve.open(config.SHELF_PATH)
+    if config.SHELF_TIMESTAMP_KEY not in shelf:
+        shelf[config.SHELF_TIMESTAMP_KEY] = None
+    tc = utils.globus_get_transfer_client(config.CLIENT_ID, config.TOKEN_PATH)
+    if not utils.globus_endpoints_ready(tc, config.SRC_ID, config.DST_ID, logger):
+        logger.info("Keeping the shards for the next run.")
+        shelf.close()
+        return
+    if config.SHELF_TRIE_KEY not in shelf:
+        shelf[config.SHELF_TRIE_KEY] = utils.GlobusDirectoryTrie(config.SRC_DIR)
+    trie = shelf[config.SHELF_TRIE_KEY]
+    dirs, files = set(), set()
+    for (shard, claimed_path) in enumerate(claimed_paths):
+        logger.info("Merging shard {}...".format(shard))
+        fragment = utils.read_shard_fragment(claimed_path)
+        if fragment.shard != shard or fragment.num_shards != config.NUM_SHARDS:
+            logger.error("Shard {} was scanned as shard {} of {}.".format(
+                shard, fragment.shard, fragment.num_shards))
+            shelf.close()
+            return
+        if fragment.top_dir != trie.top_dir:
+            logger.error("Shard {} was scanned from {} rather than {}.".format(
+                shard, fragment.top_dir, trie.top_dir))
+            shelf.close()
+            return
+        (shard_dirs, shard_files) = trie.merge_fragment(fragment)
+        dirs.update(shard_dirs)
+        files.update(shard_files)
+    utils.globus_transfer_changes(tc, trie, dirs, files, config.SRC_DIR, config.DST_DIR, 
+                                  config.SRC_ID, config.DST_ID, config.DATE_FORMAT, logger)
+    global_timestamp = utils.datetime_now(config.DATE_FORMAT)
+    shelf[config.SHELF_TRIE_KEY] = trie
+    logger.info("Setting the global timestamp to {}.".format(global_timestamp))
+    shelf[config.SHELF_TIMESTAMP_KEY] = global_timestamp
+    logger.info("Saving changes.")
+    shelf.close()
+    logger.info("Removing merged shards.")
+    for claimed_path in claimed_paths:
+        os.remove(claimed_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+
+import argparse
+import config
+import utils
+
+"""This code scans a single shard of the source directory and stores the result in the shared 
+shard directory, where it is merged by shard_coordinator.py. Several workers, each given a 
+different shard, may be run at once on one or more hosts."""
+
+__author__ = "Matthew E. Li"
+__email__ = "meli@lbl.gov"
+
+def main():
+    """Scans the given shard of the source directory and stores the resulting fragment."""
+    parser = argparse.ArgumentParser()
+    help_message = "Specify the index of the shard to scan, from 0 to {}.".format(
+        config.NUM_SHARDS - 1)
+    parser.add_argument("--shard", type=int, required=True, help=help_message)
+    args = parser.parse_args()
+    try:
+        fragment = utils.GlobusShardFragment(config.SRC_DIR, args.shard, config.NUM_SHARDS)
+        if not utils.dir_exists(config.SHARD_DIR):
+            raise FileNotFoundError("The shard directory {} does not exist.".format(
+                config.SHARD_DIR))
+    except Exception as e:
+        print(e)
+        return
+    logger = utils.get_logger(__name__, config.LOG_PATH)
+    logger.info("".join(["=" for i in range(100)]))
+    logger.info("Scanning shard {} of {}...".format(args.shard, config.NUM_SHARDS))
+    fragment.scan()
+    logger.info("Saving shard {}.".format(args.shard))
+    utils.write_shard_fragment(fragment, config.SHARD_DIR)
+
+if __name__ == "__main__":
+    main()
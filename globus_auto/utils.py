@@ -3,6 +3,8 @@
 import globus_sdk
 import logging
 import os
+import pickle
+import zlib
 from datetime import datetime
 from enum import Enum
 
@@ -197,6 +199,37 @@ class GlobusDirectoryTrie(DirectoryTrie):
                         files_to_transfer.add(absolute_path)
         return dirs_to_create, files_to_transfer
 
+    def merge_fragment(self, fragment):
+        """Inserts the paths in the given GlobusShardFragment that are not yet in the trie and 
+        returns two sets of absolute paths to be transferred, as in get_transfer_paths, using the 
+        metadata recorded in the fragment rather than rescanning the directory. Modification times 
+        are formatted in this host's local time, matching the transfer times stored in the trie.
+
+        Keyword Arguments:
+        self -- the class object
+        fragment -- a GlobusShardFragment for the same top level directory
+        """
+        if fragment.top_dir != self.top_dir:
+            raise ValueError("The fragment for {} does not belong to {}.".format(
+                fragment.top_dir, self.top_dir))
+        dirs_to_create, files_to_transfer = set(), set()
+        for (absolute_path, node_type, data) in fragment.root.iterator():
+            (found, _, last_transferred) = self.find(absolute_path)
+            if node_type == DirectoryObject.DIR:
+                if not found:
+                    self.insert(absolute_path, node_type, None)
+                    last_transferred = None
+                if data and not last_transferred:
+                    dirs_to_create.add(absolute_path)
+            elif node_type == DirectoryObject.FILE:
+                if not found:
+                    self.insert(absolute_path, node_type, None)
+                    last_transferred = None
+                modified = datetime.fromtimestamp(data).strftime(GlobusDirectoryTrie.DATE_FORMAT)
+                if not last_transferred or last_transferred < modified:
+                    files_to_transfer.add(absolute_path)
+        return dirs_to_create, files_to_transfer
+
     def set_path_untransferred(self, path):
         """Marks the entry in the GlobusDirectoryTrie for the given path as not transferred.
 
@@ -229,6 +262,86 @@ class GlobusDirectoryTrie(DirectoryTrie):
         for path in paths:
             self.insert(path, node_type, transfer_time)
 
+class GlobusShardFragment(DirectoryTrie):
+    """A subclass of DirectoryTrie holding the scan of one shard of a top level directory. The data 
+    stored for each file is its raw modification time, in seconds since the epoch, so that it is 
+    formatted on the host merging the fragment. The data stored for each directory is whether or 
+    not it is empty."""
+
+    def __init__(self, top_dir, shard, num_shards):
+        """Instantiates a GlobusShardFragment object for the given shard of the given top level 
+        directory.
+
+        Keyword Arguments:
+        self -- the class object
+        top_dir -- the absolute path to the top level directory being partitioned
+        shard -- the index of the shard represented by the fragment
+        num_shards -- the number of shards the top level directory is partitioned into
+        """
+        if not 0 <= shard < num_shards:
+            raise ValueError("The shard must be between 0 and {}.".format(num_shards - 1))
+        self.root = self.get_node()
+        self.top_dir = top_dir
+        self.shard = shard
+        self.num_shards = num_shards
+
+    def add_dir(self, dir_path):
+        """Inserts the contents of the directory at the given path into the fragment, returning 
+        whether or not the directory is empty.
+
+        Keyword Arguments:
+        self -- the class object
+        dir_path -- the path to the directory
+        """
+        empty = True
+        for entry in os.scandir(dir_path):
+            empty = False
+            self.add_entry(entry)
+        return empty
+
+    def add_entry(self, entry):
+        """Inserts the given directory entry into the fragment, recursing into directories.
+
+        Keyword Arguments:
+        self -- the class object
+        entry -- an os.DirEntry object
+        """
+        if entry.is_dir(follow_symlinks=False):
+            empty = self.add_dir(entry.path)
+            self.insert(entry.path, DirectoryObject.DIR, empty)
+        elif entry.is_file(follow_symlinks=False):
+            self.insert(entry.path, DirectoryObject.FILE, entry.stat().st_mtime)
+
+    def scan(self):
+        """Scans the top level entries of the directory belonging to the shard, along with all 
+        their contents, and inserts them into the fragment.
+
+        Keyword Arguments:
+        self -- the class object
+        """
+        for entry in os.scandir(self.top_dir):
+            if shard_index(entry.name, self.num_shards) == self.shard:
+                self.add_entry(entry)
+
+def claim_shard_fragment(shard_dir, shard):
+    """Moves the latest fragment for the given shard aside, so that workers writing a newer one 
+    do not replace it while it is being merged, and returns the path it was moved to. A fragment 
+    claimed earlier but never merged is reused if no newer one exists. Returns None if there is 
+    no fragment for the shard.
+
+    Keyword Arguments:
+    shard_dir -- the path to the directory in which fragments are stored
+    shard -- the index of the shard
+    """
+    path = shard_fragment_path(shard_dir, shard)
+    claimed_path = path + ".merging"
+    try:
+        os.replace(path, claimed_path)
+    except FileNotFoundError:
+        if not file_exists(claimed_path):
+            return None
+    return claimed_path
+
 def dir_exists(dir_path):
     """Checks whether or not the object at the given path is an existing directory.
 
@@ -334,6 +447,27 @@ def globus_endpoint_ready(tc, endpoint_id):
         reqs = tc.endpoint_get_activation_requirements(endpoint_id)
         return reqs["expires_in"] == -1 or reqs["activated"]
 
+def globus_endpoints_ready(tc, src_id, dst_id, logger):
+    """Returns whether or not both the source and destination endpoints are ready for transfer, 
+    logging any that are not.
+
+    Keyword Arguments:
+    tc -- a transfer client, necessary to check requirements
+    src_id -- the ID of the source endpoint
+    dst_id -- the ID of the destination endpoint
+    logger -- the logger to write to
+    """
+    logger.info("Checking if endpoints are ready...")
+    src_ready = globus_endpoint_ready(tc, src_id)
+    dst_ready = globus_endpoint_ready(tc, dst_id)
+    if not src_ready:
+        logger.error("Endpoint {} is not ready.".format(src_id))
+    if not dst_ready:
+        logger.error("Endpoint {} is not ready.".format(dst_id))
+    if src_ready and dst_ready:
+        logger.info("Endpoints are ready.")
+    return src_ready and dst_ready
+
 def globus_generate_refresh_token(auth_client, client_id, token_path):
     """Generates a refresh token for the given Globus Auth client having the given application ID 
     at the given path.
@@ -386,6 +520,45 @@ def globus_get_transfer_client(client_id, token_path):
     # Return a transfer client given the authorizer.
     return globus_sdk.TransferClient(authorizer=authorizer)
 
+def globus_transfer_changes(tc, trie, dirs, files, src_dir, dst_dir, src_id, dst_id, 
+                            date_format, logger):
+    """Creates the given empty directories and submits a transfer for the given files, marking 
+    each in the trie as transferred once it has been created or submitted.
+
+    Keyword Arguments:
+    tc -- a transfer client, necessary to perform a transfer
+    trie -- the GlobusDirectoryTrie storing the last transfer times
+    dirs -- a set of absolute paths for directories that need to be created
+    files -- a set of absolute paths for files that need to be transferred
+    src_dir -- the absolute path to the source directory
+    dst_dir -- the absolute path to the destination directory
+    src_id -- the ID of the source endpoint
+    dst_id -- the ID of the destination endpoint
+    date_format -- the string representation the transfer name's date should be formatted in
+    logger -- the logger to write to
+    """
+    if not dirs and not files:
+        logger.info("There were no additions or changes, so a transfer is not necessary.")
+    dir_pairs = get_src_dst_pairs(dirs, src_dir, dst_dir)
+    if dir_pairs:
+        logger.info("Attempting to create empty directories...")
+        globus_create_dirs(tc, dst_id, [dst for (src, dst) in dir_pairs.items()])
+        dir_source_paths = [src_path for src_path in dir_pairs]
+        trie.set_transfer_times(dir_source_paths, DirectoryObject.DIR)
+    file_pairs = get_src_dst_pairs(files, src_dir, dst_dir)
+    if file_pairs:
+        transfer_name = globus_transfer_name(date_format)
+        num_files = len(file_pairs)
+        logger.info("Initiating transfer {} ({} file(s))...".format(transfer_name, num_files))
+        try:
+            task_id = globus_transfer_files(tc, transfer_name, src_id, dst_id, 
+                                            file_pairs)["task_id"]
+            logger.info("Submitted transfer {}.".format(task_id))
+            file_source_paths = [src_path for src_path in file_pairs]
+            trie.set_transfer_times(file_source_paths, DirectoryObject.FILE)
+        except Exception as e:
+            logger.info("Failed to initiate transfer {}:\n{}.".format(transfer_name, e))
+
 def globus_transfer_files(tc, transfer_name, src_id, dst_id, path_pairs):
     """Transfers files from source to destination.
 
@@ -427,6 +600,15 @@ def last_modified(path, date_format):
         return datetime.fromtimestamp(os.stat(path).st_mtime).strftime(date_format)
     return None
 
+def read_shard_fragment(path):
+    """Returns the GlobusShardFragment stored at the given path.
+
+    Keyword Arguments:
+    path -- the path to the stored fragment
+    """
+    with open(path, "rb") as fragment_file:
+        return pickle.load(fragment_file)
+
 def replace_path_prefix(path, old_prefix, new_prefix):
     """Replaces the prefix of the given path with a new one. Returns None if the given path does 
     not begin with the given old prefix.
@@ -455,6 +637,25 @@ def scan_directory(dir_path):
         elif entry.is_file(follow_symlinks=False):
             yield entry
 
+def shard_fragment_path(shard_dir, shard):
+    """Returns the path at which the fragment for the given shard is stored.
+
+    Keyword Arguments:
+    shard_dir -- the path to the directory in which fragments are stored
+    shard -- the index of the shard
+    """
+    return os.path.join(shard_dir, "shard_{}.pickle".format(shard))
+
+def shard_index(name, num_shards):
+    """Returns the index of the shard that the top level entry with the given name belongs to. The 
+    index is stable across processes and hosts.
+
+    Keyword Arguments:
+    name -- the name of an entry in the top level directory
+    num_shards -- the number of shards
+    """
+    return zlib.crc32(name.encode("utf-8", "surrogateescape")) % num_shards
+
 def validate_user_path(path):
     """Returns a validated version of the given path, provided by the user. Raises an exception 
     if the path does not exist or is not absolute.
@@ -466,3 +667,25 @@ def validate_user_path(path):
     if not (os.path.exists(path) and os.path.isabs(path)):
         raise FileNotFoundError("Please enter an existing absolute path.")
     return path
+
+def write_shard_fragment(fragment, shard_dir):
+    """Stores the given GlobusShardFragment in the given directory. The fragment is written to a 
+    temporary file first and then renamed, so that a partially written fragment is never read. The 
+    temporary file is removed if the write fails.
+
+    Keyword Arguments:
+    fragment -- the GlobusShardFragment to store
+    shard_dir -- the path to the directory in which fragments are stored
+    """
+    path = shard_fragment_path(shard_dir, fragment.shard)
+    tmp_path = "{}.{}.{}.tmp".format(path, os.uname().nodename, os.getpid())
+    try:
+        with open(tmp_path, "wb") as fragment_file:
+            pickle.dump(fragment, fragment_file, protocol=pickle.HIGHEST_PROTOCOL)
+            fragment_file.flush()
+            os.fsync(fragment_file.fileno())
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise e